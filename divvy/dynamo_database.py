@@ -2,18 +2,31 @@
 
 This module interfaces with AWS's DynamoDB to read and store user data
 """
+import logging
+
 import boto3
+from boto3.dynamodb.types import TypeDeserializer
 from botocore.exceptions import ClientError
 
 from divvy import config
 
+log = logging.getLogger(__name__)
+
+dynamodb = boto3.resource('dynamodb', region_name=config.aws_region)
+table = dynamodb.Table(config.user_table)
+
+# The low-level client skips the resource layer's request and
+# response transformations on the get_user_data hot path.
+client = dynamodb.meta.client
+_deserializer = TypeDeserializer()
+
 
 def _log_and_status(response):
-    """If the response has an error code, print it.
+    """If the response has an error code, log it.
     Return a boolean success flag.
     """
     if response['ResponseMetadata']['HTTPStatusCode'] >= 300:
-        print(response)
+        log.error('DynamoDB request failed: %s', response)
         return False
     else:
         return True
@@ -22,9 +35,6 @@ def _log_and_status(response):
 def get_table():
     """Returns a reference to the table containing user data
     """
-    dynamodb = boto3.resource('dynamodb', region_name=config.aws_region)
-    table = dynamodb.Table(config.user_table)
-
     return table
 
 
@@ -44,9 +54,18 @@ def update_user_data(user_id, **data):
     any existing data associated with that user.
     If the user entry does not exist, it will be created.
     """
+    if not data:
+        # An empty "SET" expression is invalid, and there's nothing to do.
+        return True
     tb = get_table()
-    attr = {k: {'Value': v, 'Action': 'PUT'} for k, v in data.items()}
-    resp = tb.update_item(Key={'userId': user_id}, AttributeUpdates=attr)
+    names = {'#k%d' % i: k for i, k in enumerate(data)}
+    values = {':v%d' % i: v for i, v in enumerate(data.values())}
+    expression = 'SET ' + ', '.join('#k%d = :v%d' % (i, i)
+                                    for i in range(len(data)))
+    resp = tb.update_item(Key={'userId': user_id},
+                          UpdateExpression=expression,
+                          ExpressionAttributeNames=names,
+                          ExpressionAttributeValues=values)
 
     return _log_and_status(resp)
 
@@ -55,15 +74,16 @@ def get_user_data(user_id):
     """Return all data associated with a given user ID.
     Returns an empty dictionary if the user does not exist.
     """
-    tb = get_table()
     try:
-        response = tb.get_item(Key={'userId': user_id})
+        response = client.get_item(TableName=config.user_table,
+                                   Key={'userId': {'S': user_id}})
     except ClientError as e:
-        print(e.response['Error']['Message'])
+        log.error(e.response['Error']['Message'])
         raise
     else:
         _log_and_status(response)
-        item = response.get('Item', {})
+        item = {k: _deserializer.deserialize(v)
+                for k, v in response.get('Item', {}).items()}
 
     return item
 
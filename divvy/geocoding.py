@@ -1,11 +1,64 @@
 """Functions having to do with physical location
 """
 import math
+import time
 
+import numpy as np
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 from divvy import config
 
+# Seconds to wait for the geocoding API before giving up
+TIMEOUT = 3
+
+# Reuse connections to the geocoding API across requests.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(max_retries=1))
+
+# Remember geocoding results for this many seconds,
+# and remember at most this many addresses.
+GEOCODE_TTL = 3600
+GEOCODE_CACHE_SIZE = 1024
+
+# Recent geocoding results, as {address: (expiration time, result)}
+_GEOCODE_CACHE = {}
+
+# The table built from the most recently seen station list,
+# as {id(stations): StationTable}
+_TABLES = {}
+
+
+class StationTable:
+    """Station coordinates stored as arrays for vectorized calculations
+
+    Only stations which are renting and installed are included.
+
+    Attributes
+    ----------
+    stations : list of dict
+        The full station list used to build this table
+    index : np.ndarray
+        Position in `stations` of each station in the table
+    lat, lon : np.ndarray, np.ndarray
+        Station latitudes and longitudes in radians
+    """
+    def __init__(self, stations):
+        self.stations = stations
+        self.index = np.array([i for i, st in enumerate(stations)
+                               if st['is_renting'] and st['is_installed']],
+                              dtype=np.intp)
+        self.lat = np.deg2rad(np.array([stations[i]['lat']
+                                        for i in self.index],
+                                       dtype=np.float64))
+        self.lon = np.deg2rad(np.array([stations[i]['lon']
+                                        for i in self.index],
+                                       dtype=np.float64))
+
+    def __len__(self):
+        return len(self.index)
+
 
 def get_lat_lon(addr_string):
     """Convert an address to lat/lon
@@ -17,6 +70,10 @@ def get_lat_lon(addr_string):
     It's pretty good at spelling correction if the street
     name gets garbled by the speech-to-text engine.
 
+    Results are cached for `GEOCODE_TTL` seconds, so repeated
+    requests for the same address (ignoring case and extra spaces)
+    don't query the API again.
+
     Parameters
     ----------
     addr_string: str
@@ -36,16 +93,44 @@ def get_lat_lon(addr_string):
     --------
     https://developers.google.com/maps/documentation/geocoding/
     """
-    addr_string = addr_string.replace(' ', '+')
-    query = 'json?address=' + addr_string + '&key=' + config.maps_api_key
+    key = _cache_key(addr_string)
+    now = time.monotonic()
+    cached = _GEOCODE_CACHE.pop(key, None)
+    if cached is None or cached[0] < now:
+        cached = (now + GEOCODE_TTL, _geocode(addr_string))
+    if len(_GEOCODE_CACHE) >= GEOCODE_CACHE_SIZE:
+        # Forget the least recently used address.
+        del _GEOCODE_CACHE[next(iter(_GEOCODE_CACHE))]
+    _GEOCODE_CACHE[key] = cached
+
+    return cached[1]
+
+
+def is_cached(addr_string):
+    """True if `get_lat_lon` can answer without querying the API"""
+    cached = _GEOCODE_CACHE.get(_cache_key(addr_string))
+    return cached is not None and cached[0] >= time.monotonic()
+
+
+def _cache_key(addr_string):
+    """Differences in case and spacing don't change the geocoding result"""
+    return ' '.join(addr_string.lower().split())
 
-    resp = requests.get(config.maps_api + query)
+
+def _geocode(addr_string):
+    """Query the geocoding API; see `get_lat_lon`"""
+    resp = _SESSION.get(config.maps_api + 'json',
+                        params={'address': addr_string,
+                                'key': config.maps_api_key},
+                        timeout=TIMEOUT)
     if resp.status_code != 200:
-        raise RuntimeError('Error getting map coordinates: ' + resp.status)
+        raise RuntimeError('Error getting map coordinates: ' +
+                           str(resp.status_code))
 
-    lat = resp.json()['results'][0]['geometry']['location']['lat']
-    lon = resp.json()['results'][0]['geometry']['location']['lng']
-    addr = resp.json()['results'][0]['formatted_address']
+    result = orjson.loads(resp.content)['results'][0]
+    lat = result['geometry']['location']['lat']
+    lon = result['geometry']['location']['lng']
+    addr = result['formatted_address']
 
     return lat, lon, addr
 
@@ -73,15 +158,24 @@ def distance(lat1, lon1, lat2, lon2):
     Uses the haversine formula:
 
     a = sin^2(\Delta \phi /2) + cos(\phi_1) * cos(\phi_2) * sin^2(\Delta \lambda /2)
-    c = 2 * atan2( \sqrt(a), \sqrt(1-a))
+    c = 2 * asin( \sqrt(a) )
     d = R * c
     where \phi is latitude, \lambda is longitude, R is earth's radius (mean radius = 6,371 km)
     """
-    lon1, lat1 = math.radians(lon1), math.radians(lat1)
-    lon2, lat2 = math.radians(lon2), math.radians(lat2)
-    a = (math.sin((lat2 - lat1) / 2) ** 2 +
-         math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return _haversine(math.radians(lat1), math.radians(lon1),
+                      math.radians(lat2), math.radians(lon2))
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    """Great circle distance in meters between locations given in radians
+
+    Inputs may be floats or NumPy arrays; arrays are broadcast
+    against each other.
+    """
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    # Rounding can push `a` slightly above 1 for antipodal points.
+    c = 2 * np.arcsin(np.minimum(np.sqrt(a), 1))
     d = 6371000 * c
 
     return d
@@ -108,9 +202,34 @@ def station_from_lat_lon(lat, lon, stations, n_nearest=3):
     list of dict
         A list of `n_nearest` Divvy stations
     """
-    lat, lon = float(lat), float(lon)
-    distances = [(distance(lat, lon, st['lat'], st['lon']), st)
-                 for st in stations
-                 if (st['is_renting'] and st['is_installed'])]
-    distances = sorted(distances)
-    return [pair[1] for pair in distances[:n_nearest]]
+    table = station_table(stations)
+    lat, lon = math.radians(float(lat)), math.radians(float(lon))
+
+    n_nearest = min(n_nearest, len(table))
+    if n_nearest <= 0:
+        return []
+
+    # Rank the available stations with the equirectangular
+    # approximation, which is accurate to well under a meter over the
+    # size of a city. Keep a few extra candidates in case of near-ties,
+    # then order those by their haversine distance.
+    dx = (table.lon - lon) * math.cos(lat)
+    dy = table.lat - lat
+    approx = dx * dx + dy * dy
+    n_candidates = min(2 * n_nearest, len(table))
+    candidates = np.argpartition(approx, n_candidates - 1)[:n_candidates]
+    d = _haversine(lat, lon, table.lat[candidates], table.lon[candidates])
+    nearest = candidates[np.argsort(d)[:n_nearest]]
+    return [stations[i] for i in table.index[nearest]]
+
+
+def station_table(stations):
+    """Return a `StationTable` for this station list, reusing the
+    table from the previous call if the station list is the same.
+    Assumes that station lists aren't modified after they're created.
+    """
+    table = _TABLES.get(id(stations))
+    if table is None or table.stations is not stations:
+        _TABLES.clear()
+        table = _TABLES[id(stations)] = StationTable(stations)
+    return table
@@ -39,41 +39,78 @@ IntentRequest:
   }
 }
 """
-import difflib
+import importlib
 import logging
 import os
+import threading
 import time
 
-from divvy import config, geocoding, reply, location
-if config.db_type == 's3':
-    from divvy import s3_database as database
-elif config.db_type == 'dynamo':
-    from divvy import s3_database as database
-else:
+from divvy import config, reply, location
+
+# Modules which store user data, by `config.db_type`
+DB_MODULES = {'s3': 'divvy.s3_database',
+              'dynamo': 'divvy.dynamo_database'}
+if config.db_type not in DB_MODULES:
     raise ImportError("Unrecognized database type "
                       "in config: %s" % config.db_type)
 
+# The database module (which imports boto3) and `geocoding` (which
+# imports NumPy) are only needed for commutes and stored addresses.
+# Import them on first use, so that cold starts which only check
+# a station don't pay for them.
+database = None
+geocoding = None
+
 log = logging.getLogger(__name__)
 
-ORIGIN_NAMES = ['here', 'home', 'origin']
-DEST_NAMES = ['there', 'work', 'school', 'destination']
+# Report times in the network's time zone. Lambda containers
+# don't share this process with anything else, so set it once.
+os.environ['TZ'] = config.time_zone
+time.tzset()
+
+ORIGIN_NAMES = frozenset(('here', 'home', 'origin'))
+DEST_NAMES = frozenset(('there', 'work', 'school', 'destination'))
+ADDRESS_NAMES = ORIGIN_NAMES | DEST_NAMES
 
 # The following intents could be part of the AddAddress dialog.
-ADD_ADDRESS_INTENTS = ['AddAddressIntent',
-                       'AMAZON.NextIntent',
-                       'AMAZON.YesIntent',
-                       'AMAZON.NoIntent',
-                       'AMAZON.StopIntent',
-                       'AMAZON.CancelIntent']
+ADD_ADDRESS_INTENTS = frozenset(('AddAddressIntent',
+                                 'AMAZON.NextIntent',
+                                 'AMAZON.YesIntent',
+                                 'AMAZON.NoIntent',
+                                 'AMAZON.StopIntent',
+                                 'AMAZON.CancelIntent'))
 
 # These intents might be part of the RemoveAddress dialog
-REMOVE_ADDRESS_INTENTS = ['RemoveAddressIntent',
-                          'AMAZON.YesIntent',
-                          'AMAZON.NoIntent',
-                          'AMAZON.StopIntent',
-                          'AMAZON.CancelIntent']
-
-def intent(req, session):
+REMOVE_ADDRESS_INTENTS = frozenset(('RemoveAddressIntent',
+                                    'AMAZON.YesIntent',
+                                    'AMAZON.NoIntent',
+                                    'AMAZON.StopIntent',
+                                    'AMAZON.CancelIntent'))
+
+# Reply to the AMAZON.HelpIntent
+HELP_TEXT = ("You can ask me how many bikes or docks are "
+             "at a specific station, or else just ask the "
+             "status of a station. Use the %s station "
+             "name, such as \"%s\". "
+             "If you only remember one cross-street, you "
+             "can ask me to list all stations on a particular "
+             "street. If you've told me to \"add an address\", "
+             "I can remember that and use it when you "
+             "ask me to \"check my commute\". "
+             "What should I do?" %
+             (config.network_name, config.sample_station))
+
+# Reply to the AMAZON.StopIntent and AMAZON.CancelIntent. This doesn't
+# depend on the session, so build it once. Don't modify it.
+EXIT_REPLY = reply.build("Okay, exiting.", is_end=True)
+
+# The most recent station list, and when we retrieved it
+_STATIONS_CACHE = {'t': 0, 'data': None}
+# Held while refreshing the station list, so that a background
+# fetch and a new request don't both query the API.
+_STATIONS_LOCK = threading.Lock()
+
+def intent(req, session, context=None):
     """Identify and handle IntentRequest objects
 
     Parameters
@@ -82,6 +119,9 @@ def intent(req, session):
         JSON following the Alexa "IntentRequest" schema
     session : dict
         JSON following the Alexa "Session" schema
+    context : dict, optional
+        JSON following the Alexa "Context" schema. If provided,
+        slow handlers can send progressive responses.
 
     Returns
     -------
@@ -93,6 +133,13 @@ def intent(req, session):
         # Ensure that there's always a dictionary under "attributes".
         session['attributes'] = {}
 
+    system = (context or {}).get('System', {})
+    if system.get('apiAccessToken'):
+        # Remember what we need to send progressive responses.
+        session['progressive'] = dict(request_id=req['requestId'],
+                                      api_endpoint=system['apiEndpoint'],
+                                      api_token=system['apiAccessToken'])
+
     # If the user has already opened a dialog, handle incorrect
     # Intents from Alexa due to misunderstandings or user error.
     if session['attributes'].get('add_address') and \
@@ -119,60 +166,95 @@ def intent(req, session):
         intent['name'] = 'AMAZON.NoIntent'
 
     # Dispatch each Intent to the correct handler.
-    if intent['name'] == 'CheckBikeIntent':
-        if not intent['slots']['bikes_or_docks'].get('value'):
-            # If something went wrong understanding the bike/dock
-            # value, fall back on the status check.
-            return check_status(intent, session)
-        else:
-            return check_bikes(intent, session)
-    elif intent['name'] == 'CheckStatusIntent':
+    return _INTENT_HANDLERS.get(intent['name'], _unknown_intent)(intent,
+                                                                 session)
+
+
+def _say_progress(session, speech):
+    """Speak while the user waits, if this request allows it"""
+    if session.get('progressive'):
+        reply.progressive(speech, **session['progressive'])
+
+
+def _check_bike_or_status(intent, session):
+    """Handle a CheckBikeIntent, falling back on the status check"""
+    if not intent['slots']['bikes_or_docks'].get('value'):
+        # If something went wrong understanding the bike/dock
+        # value, fall back on the status check.
         return check_status(intent, session)
-    elif intent['name'] == 'ListStationIntent':
-        return list_stations(intent, session)
-    elif intent['name'] == 'CheckCommuteIntent':
-        return check_commute(intent, session)
-    elif intent['name'] == 'AddAddressIntent':
-        return add_address(intent, session)
-    elif intent['name'] == 'CheckAddressIntent':
-        return check_address(intent, session)
-    elif intent['name'] == 'RemoveAddressIntent':
-        return remove_address(intent, session)
-    elif intent['name'] == 'AMAZON.NextIntent':
-        return next_intent(intent, session)
-    elif intent['name'] == 'AMAZON.YesIntent':
-        return yes_intent(intent, session)
-    elif intent['name'] == 'AMAZON.NoIntent':
-        return no_intent(intent, session)
-    elif intent['name'] in ['AMAZON.StopIntent', 'AMAZON.CancelIntent']:
-        return reply.build("Okay, exiting.", is_end=True)
-    elif intent['name'] == 'AMAZON.HelpIntent':
-        return reply.build("You can ask me how many bikes or docks are "
-                           "at a specific station, or else just ask the "
-                           "status of a station. Use the %s station "
-                           "name, such as \"%s\". "
-                           "If you only remember one cross-street, you "
-                           "can ask me to list all stations on a particular "
-                           "street. If you've told me to \"add an address\", "
-                           "I can remember that and use it when you "
-                           "ask me to \"check my commute\". "
-                           "What should I do?" %
-                           (config.network_name, config.sample_station),
-                           persist=session['attributes'],
-                           is_end=False)
     else:
-        return reply.build("I didn't understand that. Try again?",
-                           persist=session['attributes'],
-                           is_end=False)
+        return check_bikes(intent, session)
+
+
+def _exit_intent(intent, session):
+    """Handle the AMAZON.StopIntent and AMAZON.CancelIntent"""
+    return EXIT_REPLY
+
+
+def help_intent(intent, session):
+    """Handle the AMAZON.HelpIntent"""
+    return reply.build(HELP_TEXT,
+                       persist=session['attributes'],
+                       is_end=False)
+
+
+def _unknown_intent(intent, session):
+    """Reply to any Intent we don't have a handler for"""
+    return reply.build("I didn't understand that. Try again?",
+                       persist=session['attributes'],
+                       is_end=False)
+
+
+def _database():
+    """Return the database module, importing it if needed"""
+    global database
+    if database is None:
+        database = importlib.import_module(DB_MODULES[config.db_type])
+    return database
+
+
+def _geocoding():
+    """Return the `geocoding` module, importing it if needed"""
+    global geocoding
+    if geocoding is None:
+        from divvy import geocoding
+    return geocoding
 
 
 def _time_string():
     """Return a string representing local time"""
-    os.environ['TZ'] = config.time_zone
-    time.tzset()
     return time.asctime()
 
 
+def _get_stations_cached():
+    """Return the station list from the bikeshare API
+
+    Warm Lambda containers reuse the previous station list
+    if it's less than `config.stations_ttl` seconds old
+    (30 seconds by default).
+    """
+    with _STATIONS_LOCK:
+        if _stations_expired():
+            _STATIONS_CACHE['data'] = location.get_stations(config.bikes_api)
+            _STATIONS_CACHE['t'] = time.monotonic()
+        return _STATIONS_CACHE['data']
+
+
+def _stations_expired():
+    """True if `_get_stations_cached` needs to query the bikeshare API"""
+    ttl = getattr(config, 'stations_ttl', 30)
+    return (_STATIONS_CACHE['data'] is None or
+            time.monotonic() - _STATIONS_CACHE['t'] >= ttl)
+
+
+def _prefetch_stations():
+    """Fill the station cache, logging (not raising) any errors"""
+    try:
+        _get_stations_cached()
+    except Exception:  # NOQA
+        log.warning('Failed to prefetch the station list.', exc_info=True)
+
+
 def _station_from_intent(intent, stations):
     """Given a request and a list of stations, find the desired station
 
@@ -186,28 +268,28 @@ def _station_from_intent(intent, stations):
 
     Returns
     -------
-    dict
-        A single station information JSON from the bikeshare API response
+    dict or None
+        A single station information JSON from the bikeshare API response,
+        or None if the request didn't include a station name
 
     Raises
     ------
     AmbiguousStationError if the name(s) in the request
         don't uniquely specify a station
     """
-    slots = intent['slots']
-    if slots.get('station_name', {}).get('value'):
-        name = slots['station_name']['value']
-        if ' and ' in name:
-            # Try to be robust to re-orderings of street names.
-            tokens = name.split(' and ')
-            if len(tokens) != 2:
-                first, second = name, None
-            else:
-                first, second = name.split(' and ')
+    slots = intent.get('slots', {})
+    name = slots.get('station_name', {}).get('value')
+    if name:
+        # Try to be robust to re-orderings of street names.
+        tokens = name.split(' and ')
+        if len(tokens) == 2:
+            first, second = tokens
         else:
             first, second = name, None
     else:
-        first = slots['first_street']['value']
+        first = slots.get('first_street', {}).get('value')
+        if not first:
+            return None
         second = slots.get('second_street', {}).get('value')
     sta = location.find_station(stations, first, second, exact=False)
     return sta
@@ -217,15 +299,15 @@ def next_intent(intent, session):
     """Handle the AMAZON.NextIntent
 
     This should only come up as part of the AddAddressIntent dialog."""
+    attrs = session.get('attributes', {})
     # This is part of the AddAddressIntent dialog
-    if session.get('attributes', {}).get('add_address') and \
-                session['attributes']['next_step'] == 'zip':
-        session['attributes']['next_step'] = 'check_address'
-        session['attributes']['zip_code'] = ''
+    if attrs.get('add_address') and attrs['next_step'] == 'zip':
+        attrs['next_step'] = 'check_address'
+        attrs['zip_code'] = ''
         return add_address(intent, session)
     else:
         return reply.build("Sorry, I don't know what you mean. Try again?",
-                           persist=session.get('attributes', {}),
+                           persist=attrs,
                            is_end=False)
 
 
@@ -234,14 +316,14 @@ def yes_intent(intent, session):
 
     This is expected to be part of the AddAddressIntent
     or RemoveAddressIntent dialog"""
-    if session.get('attributes', {}).get('add_address') and \
-                session['attributes']['next_step'] == 'store_address':
+    attrs = session.get('attributes', {})
+    if attrs.get('add_address') and attrs['next_step'] == 'store_address':
         return store_address(intent, session)
-    elif session.get('attributes', {}).get('remove_address'):
+    elif attrs.get('remove_address'):
         return remove_address(intent, session)
     else:
         return reply.build("Sorry, I don't know what you mean. Try again?",
-                           persist=session.get('attributes', {}),
+                           persist=attrs,
                            is_end=False)
 
 
@@ -250,18 +332,18 @@ def no_intent(intent, session):
 
     This is expected to be part of the AddAddressIntent
     or RemoveAddressIntent dialog"""
-    if session.get('attributes', {}).get('add_address') and \
-                session['attributes']['next_step'] == 'store_address':
-        session['attributes']['next_step'] = 'num_and_name'
+    attrs = session.get('attributes', {})
+    if attrs.get('add_address') and attrs['next_step'] == 'store_address':
+        attrs['next_step'] = 'num_and_name'
         return reply.build("Okay, what street number and name do you want?",
                            reprompt="What's the street number and name?",
-                           persist=session['attributes'],
+                           persist=attrs,
                            is_end=False)
-    elif session.get('attributes', {}).get('remove_address'):
+    elif attrs.get('remove_address'):
         return remove_address(intent, session)
     else:
         return reply.build("Sorry, I don't know what you mean. Try again?",
-                           persist=session.get('attributes', {}),
+                           persist=attrs,
                            is_end=False)
 
 
@@ -296,62 +378,66 @@ def check_commute(intent, session):
     dict
         JSON following the Alexa reply schema
     """
-    user_data = database.get_user_data(session['user']['userId'])
-    if not user_data:
+    user_data = _database().get_user_data(session['user']['userId'])
+    if not user_data or not (user_data.get('origin') or
+                             user_data.get('destination')):
         return reply.build("I don't remember any of your addresses. "
                            "You can ask me to \"save an address\" "
                            "if you want me to be able to check "
                            "on your daily commute.",
                            is_end=True)
-    stations = location.get_stations(config.bikes_api)
+    if _stations_expired():
+        _say_progress(session, "Checking your commute.")
+    stations = _get_stations_cached()
     utter = ''
-    card_text = ['Checked at %s' % _time_string()]
+    card_text = [f'Checked at {_time_string()}']
     first_phrase = True
-    for which, av_func, av_name in \
-          [('origin', _get_bikes_available, 'bikes'),
-           ('destination', _get_docks_available, 'docks')]:
-        if user_data.get(which):
-            lat = user_data[which]['latitude']
-            lon = user_data[which]['longitude']
-            nearest_st = geocoding.station_from_lat_lon(
-                  lat, lon, stations, n_nearest=2)
-
-            n_thing = av_func(nearest_st[0])
-            st_name = location.text_to_speech(nearest_st[0]['name'])
-            av_slice = slice(0, (-1 if n_thing == 1 else None))  # singular?
-            phrase = ('%d %s at the %s station' %
-                      (n_thing, av_name[av_slice], st_name))
-            if first_phrase:
-                verb = 'is' if n_thing == 1 else 'are'
-                phrase = ('There %s ' % verb) + phrase
-            else:
-                phrase = ', and ' + phrase
-            utter += phrase
-            first_phrase = False
-            card_text.append("%s: %d %s at %s" %
-                             (which.capitalize(),
-                              n_thing,
-                              av_name[av_slice],
-                              nearest_st[0]['name']))
-
-            if n_thing < 3:
-                # If there's not many bikes/docks at the best station,
-                # refer users to the next nearest station.
-                n_thing = av_func(nearest_st[1])
-                av_slice = slice(0, (-1 if n_thing == 1 else None))  # singular?
-                st_name = location.text_to_speech(nearest_st[1]['name'])
-                utter += (', and %d %s at the next nearest station, %s. ' %
-                          (n_thing, av_name[av_slice], st_name))
-                first_phrase = True  # Start a new sentence next time
-                card_text.append("Next Best %s: %d %s at %s" %
-                                 (which.capitalize(),
-                                  n_thing,
-                                  av_name[av_slice],
-                                  nearest_st[1]['name']))
+    # Look up the nearest stations for every stored address first,
+    # then assemble the reply from the results in order. The lookups
+    # are in-memory array operations, so they run in sequence.
+    lookups = [(which, av_func, av_name,
+                _geocoding().station_from_lat_lon(
+                    user_data[which]['latitude'],
+                    user_data[which]['longitude'],
+                    stations, n_nearest=2))
+               for which, av_func, av_name in
+               [('origin', _get_bikes_available, 'bikes'),
+                ('destination', _get_docks_available, 'docks')]
+               if user_data.get(which)]
+    for which, av_func, av_name, nearest_st in lookups:
+        best = nearest_st[0]
+        label = which.capitalize()
+        singular = av_name[:-1]
+        n_thing = av_func(best)
+        st_name = location.text_to_speech(best['name'])
+        things = singular if n_thing == 1 else av_name
+        phrase = f'{n_thing} {things} at the {st_name} station'
+        if first_phrase:
+            verb = 'is' if n_thing == 1 else 'are'
+            phrase = f'There {verb} {phrase}'
+        else:
+            phrase = ', and ' + phrase
+        utter += phrase
+        first_phrase = False
+        card_text.append(f"{label}: {n_thing} {things} "
+                         f"at {best['name']}")
+
+        if n_thing < 3:
+            # If there's not many bikes/docks at the best station,
+            # refer users to the next nearest station.
+            alt = nearest_st[1]
+            n_thing = av_func(alt)
+            things = singular if n_thing == 1 else av_name
+            st_name = location.text_to_speech(alt['name'])
+            utter += (f', and {n_thing} {things} '
+                      f'at the next nearest station, {st_name}. ')
+            first_phrase = True  # Start a new sentence next time
+            card_text.append(f"Next Best {label}: {n_thing} {things} "
+                             f"at {alt['name']}")
 
     return reply.build(utter,
-                       card_title=("Your %s Commute Status" %
-                                   config.network_name),
+                       card_title=(f"Your {config.network_name} "
+                                   f"Commute Status"),
                        card_text='\n'.join(card_text),
                        is_end=True)
 
@@ -378,7 +464,7 @@ def remove_address(intent, session):
     sess_data['remove_address'] = True
 
     # Retrieve stored data just to check if it exists or not.
-    user_data = database.get_user_data(session['user']['userId'])
+    user_data = _database().get_user_data(session['user']['userId'])
     if not user_data:
         return reply.build("I already don't remember any addresses for you.",
                            is_end=True)
@@ -389,7 +475,7 @@ def remove_address(intent, session):
             return reply.build("Okay, keeping your stored addresses.",
                                is_end=True)
         elif intent['name'] == 'AMAZON.YesIntent':
-            succ = database.delete_user(session['user']['userId'])
+            succ = _database().delete_user(session['user']['userId'])
             if succ:
                 return reply.build("Okay, I've forgotten all the addresses "
                                    "you told me.", is_end=True)
@@ -431,9 +517,10 @@ def add_address(intent, session):
     slots = intent.get('slots')
     sess_data = session.setdefault('attributes', {})
     sess_data['add_address'] = True
-    sess_data.setdefault('next_step', 'which')
-    if sess_data['next_step'] == 'which':
-        if slots['which_address'].get('value') in ORIGIN_NAMES:
+    next_step = sess_data.setdefault('next_step', 'which')
+    if next_step == 'which':
+        which = (slots['which_address'].get('value') or '').lower()
+        if which in ORIGIN_NAMES:
             sess_data['which'] = 'origin'
             sess_data['next_step'] = 'num_and_name'
             return reply.build("Okay, storing your origin address. "
@@ -441,7 +528,7 @@ def add_address(intent, session):
                                reprompt="What's the street number and name?",
                                persist=sess_data,
                                is_end=False)
-        elif slots['which_address'].get('value') in DEST_NAMES:
+        elif which in DEST_NAMES:
             sess_data['which'] = 'destination'
             sess_data['next_step'] = 'num_and_name'
             return reply.build("Okay, storing your destination address. "
@@ -456,15 +543,13 @@ def add_address(intent, session):
                                reprompt='You can say "here" or "destination".',
                                persist=sess_data,
                                is_end=False)
-    elif sess_data['next_step'] == 'num_and_name':
+    elif next_step == 'num_and_name':
         if slots['address_street'].get('value'):
             num = slots.get('address_number', {}).get('value', '')
             direction = slots.get('direction', {}).get('value', '')
             st = slots.get('address_street', {}).get('value', '')
-            sess_data['spoken_address'] = (('%s %s %s' %
-                                            (num, direction, st))
-                                           .replace('  ', ' ')
-                                           .strip())
+            sess_data['spoken_address'] = ' '.join(
+                filter(None, (num, direction, st)))
             sess_data['next_step'] = 'zip'
             return reply.build("Got it. Now what's the zip code? "
                                "You can tell me "
@@ -477,7 +562,7 @@ def add_address(intent, session):
                                reprompt="What's the street number and name?",
                                persist=sess_data,
                                is_end=False)
-    elif sess_data['next_step'] == 'zip':
+    elif next_step == 'zip':
         if not slots['address_number'].get('value'):
             return reply.build("I need the zip code now.",
                                reprompt="What's the zip code?",
@@ -486,34 +571,33 @@ def add_address(intent, session):
         sess_data['next_step'] = 'check_address'
         sess_data['zip_code'] = slots['address_number']['value']
         return add_address(intent, session)
-    elif sess_data['next_step'] == 'check_address':
+    elif next_step == 'check_address':
         if sess_data['zip_code']:
             # Assume that network subscribers are always interested
             # in in-state addresses, but not necessarily in the city.
-            addr = '%s, %s, %s' % (sess_data['spoken_address'],
-                                   config.default_state,
-                                   sess_data['zip_code'])
+            addr = (f"{sess_data['spoken_address']}, "
+                    f"{config.default_state}, {sess_data['zip_code']}")
         else:
             # Without a zip code, assume the network's home city
             # to add necessary specificity.
-            addr = '%s, %s, %s' % (sess_data['spoken_address'],
-                                   config.default_city,
-                                   config.default_state)
-        lat, lon, full_address = geocoding.get_lat_lon(addr)
+            addr = (f"{sess_data['spoken_address']}, "
+                    f"{config.default_city}, {config.default_state}")
+        if not _geocoding().is_cached(addr):
+            _say_progress(session, "One moment while I look that up.")
+        lat, lon, full_address = _geocoding().get_lat_lon(addr)
         if full_address.endswith(", USA"):
             # We don't need to keep the country name.
             full_address = full_address[:-5]
 
-        if full_address.lower().startswith("%s, %s" %
-                                           (config.default_city.lower(),
-                                            config.default_state.lower())):
+        if full_address.lower().startswith(
+                f"{config.default_city}, {config.default_state}".lower()):
             # If the geocoding fails to find a specific address,
             # it will return a generic city location.
             sess_data['next_step'] = 'num_and_name'
-            return reply.build("I'm sorry, I heard the address \"%s\", "
-                               "but I can't figure out where that is. "
-                               "Try a different address, something I can "
-                               "look up on the map." % addr,
+            return reply.build(f"I'm sorry, I heard the address \"{addr}\", "
+                               f"but I can't figure out where that is. "
+                               f"Try a different address, something I can "
+                               f"look up on the map.",
                                reprompt="What's the street number and name?",
                                persist=sess_data,
                                is_end=False)
@@ -521,23 +605,21 @@ def add_address(intent, session):
         sess_data['latitude'], sess_data['longitude'] = lat, lon
         sess_data['full_address'] = full_address
         sess_data['next_step'] = 'store_address'
-        return reply.build("Thanks! Do you want to set "
-                           "your %s address to %s?" %
-                           (sess_data['which'],
-                            location.text_to_speech(full_address)),
+        return reply.build(f"Thanks! Do you want to set "
+                           f"your {sess_data['which']} address to "
+                           f"{location.text_to_speech(full_address)}?",
                            reprompt="Is that the correct address?",
                            persist=sess_data,
                            is_end=False)
-    elif sess_data['next_step'] == 'store_address':
+    elif next_step == 'store_address':
         # The user should have said "yes" or "no" after
         # being asked if we should store the address.
         # Only get here if they didn't.
         full_address = sess_data['full_address']
-        return reply.build("Sorry, I didn't understand that. "
-                           "Do you want to set "
-                           "your %s address to %s?" %
-                           (sess_data['which'],
-                            location.text_to_speech(full_address)),
+        return reply.build(f"Sorry, I didn't understand that. "
+                           f"Do you want to set "
+                           f"your {sess_data['which']} address to "
+                           f"{location.text_to_speech(full_address)}?",
                            reprompt="Is that the correct address?",
                            persist=sess_data,
                            is_end=False)
@@ -559,13 +641,13 @@ def store_address(intent, session):
     data = {sess_data['which']: dict(latitude=str(sess_data['latitude']),
                                      longitude=str(sess_data['longitude']),
                                      address=str(sess_data['full_address']))}
-    success = database.update_user_data(session['user']['userId'], **data)
+    success = _database().update_user_data(session['user']['userId'], **data)
     if not success:
         return reply.build("I'm sorry, something went wrong and I could't "
                            "store the address.", is_end=True)
     else:
-        return reply.build("Okay, I've saved your %s "
-                           "address." % sess_data['which'],
+        return reply.build(f"Okay, I've saved your {sess_data['which']} "
+                           f"address.",
                            is_end=True)
 
 
@@ -585,7 +667,7 @@ def check_address(intent, session):
     dict
         JSON following the Alexa reply schema
     """
-    user_data = database.get_user_data(session['user']['userId'])
+    user_data = _database().get_user_data(session['user']['userId'])
     if not user_data:
         return reply.build("I don't remember any of your addresses.",
                            is_end=True)
@@ -596,9 +678,14 @@ def check_address(intent, session):
         # We might not have gotten anything in the slot.
         which = None
     else:
-        which = difflib.get_close_matches(which_raw.lower(),
-                                          ORIGIN_NAMES + DEST_NAMES, n=1)
-        which = which[0] if which else None
+        which = which_raw.lower().strip()
+        if which not in ADDRESS_NAMES:
+            # Allow for small speech-to-text errors. Import `difflib`
+            # here to keep it out of cold starts.
+            import difflib
+            which = difflib.get_close_matches(which,
+                                              sorted(ADDRESS_NAMES), n=1)
+            which = which[0] if which else None
 
     if which in ORIGIN_NAMES:
         which_lab = 'origin'
@@ -618,10 +705,10 @@ def _speak_address(which, user_data):
     """Assume that `which` is either "origin" or "destination"."""
     addr = user_data.get(which)
     if not addr:
-        return "I don't know your %s address." % which
+        return f"I don't know your {which} address."
     else:
-        return ("Your %s address is set to %s." %
-                (which, location.text_to_speech(addr['address'])))
+        return (f"Your {which} address is set to "
+                f"{location.text_to_speech(addr['address'])}.")
 
 
 def check_bikes(intent, session):
@@ -640,13 +727,13 @@ def check_bikes(intent, session):
     dict
         JSON following the Alexa reply schema
     """
-    stations = location.get_stations(config.bikes_api)
+    stations = _get_stations_cached()
     try:
         sta = _station_from_intent(intent, stations)
     except location.AmbiguousStationError as err:
         return reply.build(str(err), is_end=True)
-    except:  # NOQA
-        log.exception('Failed to get a station.')
+    if sta is None:
+        log.info("Didn't hear a station name.")
         return reply.build("I'm sorry, I didn't understand that. Try again?",
                            persist=session.get('attributes', {}),
                            is_end=False)
@@ -663,10 +750,9 @@ def check_bikes(intent, session):
 
     verb = 'is' if n_things == 1 else 'are'
     b_or_d = b_or_d[:-1] if n_things == 1 else b_or_d  # singular?
-    text = ("There %s %d %s available at the %s station%s"
-            % (verb, n_things, b_or_d,
-               location.text_to_speech(sta['name']),
-               postamble))
+    sta_name = location.text_to_speech(sta['name'])
+    text = (f"There {verb} {n_things} {b_or_d} available "
+            f"at the {sta_name} station{postamble}")
     return reply.build(text, is_end=True)
 
 
@@ -687,51 +773,48 @@ def check_status(intent, session):
     dict
         JSON following the Alexa reply schema
     """
-    stations = location.get_stations(config.bikes_api)
+    stations = _get_stations_cached()
     try:
         sta = _station_from_intent(intent, stations)
     except location.AmbiguousStationError as err:
         return reply.build(str(err), is_end=True)
-    except:  # NOQA
-        log.exception('Failed to get a station.')
+    if sta is None:
+        log.info("Didn't hear a station name.")
         return reply.build("I'm sorry, I didn't understand that. Try again?",
                            persist=session.get('attributes', {}),
                            is_end=False)
 
     sta_name = location.text_to_speech(sta['name'])
+    card_title = f"{sta['name']} Status"
+    now = _time_string()
     if not sta['is_installed']:
-        return reply.build("The %s station isn't "
-                           "installed at this time." % sta_name,
-                           card_title='%s Status' % sta['name'],
-                           card_text='%s\nNot installed' % _time_string(),
+        return reply.build(f"The {sta_name} station isn't "
+                           f"installed at this time.",
+                           card_title=card_title,
+                           card_text=f'{now}\nNot installed',
                            is_end=True)
     if not sta['is_renting']:
-        return reply.build("The %s station isn't "
-                           "renting right now." % sta_name,
-                           card_title='%s Status' % sta['name'],
-                           card_text='%s\nNot renting' % _time_string(),
+        return reply.build(f"The {sta_name} station isn't "
+                           f"renting right now.",
+                           card_title=card_title,
+                           card_text=f'{now}\nNot renting',
                            is_end=True)
     if not sta['is_returning']:
-        return reply.build("The %s station isn't "
-                           "accepting returned bikes right now." % sta_name,
-                           card_title='%s Status' % sta['name'],
-                           card_text='%s\nNot returning' % _time_string(),
+        return reply.build(f"The {sta_name} station isn't "
+                           f"accepting returned bikes right now.",
+                           card_title=card_title,
+                           card_text=f'{now}\nNot returning',
                            is_end=True)
 
     n_bike = _get_bikes_available(sta)
     n_dock = _get_docks_available(sta)
-    text = ("There %s %d bike%s and %d dock%s "
-            "at the %s station."
-            % ("is" if n_bike == 1 else "are",
-               n_bike, "" if n_bike == 1 else "s",
-               n_dock, "" if n_dock == 1 else "s",
-               sta_name))
-    return reply.build(text,
-                       card_title='%s Status' % sta['name'],
-                       card_text=("At %s:\n%d bike%s and %d dock%s" %
-                                  (_time_string(),
-                                   n_bike, "" if n_bike == 1 else "s",
-                                   n_dock, "" if n_dock == 1 else "s")),
+    bikes = f'{n_bike} bike{"" if n_bike == 1 else "s"}'
+    docks = f'{n_dock} dock{"" if n_dock == 1 else "s"}'
+    verb = "is" if n_bike == 1 else "are"
+    return reply.build(f"There {verb} {bikes} and {docks} "
+                       f"at the {sta_name} station.",
+                       card_title=card_title,
+                       card_text=f"At {now}:\n{bikes} and {docks}",
                        is_end=True)
 
 
@@ -751,37 +834,53 @@ def list_stations(intent, session):
     dict
         JSON following the Alexa reply schema
     """
-    stations = location.get_stations(config.bikes_api)
+    stations = _get_stations_cached()
     street_name = intent['slots']['street_name']['value']
-    possible = location.matching_station_list(stations,
-                                              street_name,
-                                              exact=True)
+    possible = location.street_station_list(stations, street_name)
     street_name = street_name.capitalize()
+    card_title = f"{config.network_name} Stations on {street_name}"
 
     if len(possible) == 0:
-        return reply.build("I didn't find any stations on %s." % street_name,
+        return reply.build(f"I didn't find any stations on {street_name}.",
                            is_end=True)
     elif len(possible) == 1:
         sta_name = location.text_to_speech(possible[0]['name'])
-        return reply.build("There's only one: the %s "
-                           "station." % sta_name,
-                           card_title=("%s Stations on %s" %
-                                       (config.network_name, street_name)),
-                           card_text=("One station on %s: %s" %
-                                      (street_name, possible[0]['name'])),
+        return reply.build(f"There's only one: the {sta_name} station.",
+                           card_title=card_title,
+                           card_text=(f"One station on {street_name}: "
+                                      f"{possible[0]['name']}"),
                            is_end=True)
     else:
-        last_name = location.text_to_speech(possible[-1]['name'])
-        speech = "There are %d stations on %s: " % (len(possible),
-                                                    street_name)
-        speech += (', '.join([location.text_to_speech(p['name'])
-                              for p in possible[:-1]]) +
-                   ', and %s' % last_name)
-        card_text = ("The following %d stations are on %s:\n%s" %
-                     (len(possible), street_name,
-                      '\n'.join(p['name'] for p in possible)))
+        names = [p['name'] for p in possible]
+        spoken = [location.text_to_speech(name) for name in names]
+        speech = (f"There are {len(names)} stations on {street_name}: "
+                  f"{', '.join(spoken[:-1])}, and {spoken[-1]}")
+        card_text = (f"The following {len(names)} stations "
+                     f"are on {street_name}:\n" + '\n'.join(names))
         return reply.build(speech,
-                           card_title=("%s Stations on %s" %
-                                       (config.network_name, street_name)),
+                           card_title=card_title,
                            card_text=card_text,
                            is_end=True)
+
+
+# Map each Intent name to the function which handles it.
+_INTENT_HANDLERS = {
+    'CheckBikeIntent': _check_bike_or_status,
+    'CheckStatusIntent': check_status,
+    'ListStationIntent': list_stations,
+    'CheckCommuteIntent': check_commute,
+    'AddAddressIntent': add_address,
+    'CheckAddressIntent': check_address,
+    'RemoveAddressIntent': remove_address,
+    'AMAZON.NextIntent': next_intent,
+    'AMAZON.YesIntent': yes_intent,
+    'AMAZON.NoIntent': no_intent,
+    'AMAZON.StopIntent': _exit_intent,
+    'AMAZON.CancelIntent': _exit_intent,
+    'AMAZON.HelpIntent': help_intent,
+}
+
+if getattr(config, 'prefetch_stations', False):
+    # Download the station list while the Lambda finishes its cold start.
+    # The first request waits on `_STATIONS_LOCK` if it's not done yet.
+    threading.Thread(target=_prefetch_stations, daemon=True).start()
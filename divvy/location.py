@@ -2,12 +2,40 @@
 stored station information which comes back from
 the bikeshare network's API.
 """
-import difflib
+import collections
+from concurrent import futures
+import functools
 import logging
+import re
+import time
+
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 
 log = logging.getLogger(__name__)
 
+# Seconds to wait for the bikeshare API before giving up
+TIMEOUT = 3
+
+# Reuse connections to the bikeshare API across requests.
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_maxsize=4, max_retries=1))
+
+# Remember the URLs of the station feeds for this many seconds
+FEEDS_TTL = 3600
+
+# Recent station feed URLs, as {bike_api: (expiration time, feeds)}
+_FEEDS_CACHE = {}
+
+# Station names and locations change rarely. Remember the
+# station information feed for this many seconds.
+STATION_INFO_TTL = 3600
+
+# Recent station information, as
+# {bike_api: (expiration time, station info, station IDs)}
+_STATION_INFO_CACHE = {}
+
 # Create a couple of lookup tables to go
 # between the name format given to us by
 # the API and the transcription of spoken words.
@@ -28,6 +56,32 @@ DIRECTIONS = {' n ': ' north ',
               ' s ': ' south ',
               ' e ': ' east '}
 
+# Words which `speech_to_text` replaces, and their replacements.
+# Match whole words only, i.e. with a space before and a space or
+# the end of the string after.
+_SPEECH_ABBREV = {full.strip(): ab.strip() for ab, full in ABBREV.items()}
+_SPEECH_ABBREV['and'] = '&'
+_SPEECH_ABBREV_RE = re.compile(r'(?<= )(%s)(?= |$)' %
+                               '|'.join(map(re.escape, _SPEECH_ABBREV)))
+
+# Abbreviated street types, e.g. "st" and "ave"
+_STREET_SUFFIXES = frozenset(ab.strip() for ab in ABBREV)
+
+# Abbreviations which `text_to_speech` expands, and their expansions
+_TEXT_ABBREV = {ab.strip(): full.strip()
+                for ab, full in {**ABBREV, **DIRECTIONS}.items()}
+_TEXT_ABBREV_RE = re.compile(r'(?<= )(%s)(?= |$)' %
+                             '|'.join(map(re.escape, _TEXT_ABBREV)))
+
+# Remember the stations matching at most this many requests
+MATCH_CACHE_SIZE = 512
+
+# Length of the substrings used to index station names and addresses
+NGRAM_LEN = 3
+
+# The most recently seen station list, and its index
+_INDEX = {'stations': None, 'index': None}
+
 
 class AmbiguousStationError(ValueError):
     """This error indicates that we expected a single
@@ -36,6 +90,103 @@ class AmbiguousStationError(ValueError):
     pass
 
 
+class StationIndex:
+    """Lookup tables for matching text to a list of stations
+
+    Lowercases the searchable station fields once, and indexes every
+    `NGRAM_LEN`-character substring of those fields. Any station which
+    contains a search string must contain all of its n-grams, so only
+    stations with every n-gram need a substring test.
+
+    Stations are referred to by their position in the station list.
+    The index only depends on the station names and addresses, so it
+    can be used with any station list which has the same `key`.
+    """
+    def __init__(self, stations, key=None):
+        self.key = _text_key(stations) if key is None else key
+        self.name = [sta['name'].lower() for sta in stations]
+        self.address = [sta.get('address', '').lower() for sta in stations]
+        self.cross_street = [sta.get('cross_street', '').lower()
+                             for sta in stations]
+
+        # Positions of the stations matching recent requests
+        self.matches = {}
+
+        # If names are duplicated, keep the first station.
+        # Also look up "A & B" names by the pair of streets,
+        # so that the streets can be given in either order,
+        # and list the stations named for each street.
+        self.by_name = {}
+        self.by_streets = {}
+        self.by_street = collections.defaultdict(list)
+        for i, name in enumerate(self.name):
+            self.by_name.setdefault(name, i)
+            streets = name.split(' & ')
+            if len(streets) == 2:
+                self.by_streets.setdefault(frozenset(streets), i)
+            for street in dict.fromkeys(_street_keys(streets)):
+                self.by_street[street].append(i)
+
+        self._ngrams = collections.defaultdict(set)
+        for i, fields in enumerate(zip(self.name, self.address,
+                                       self.cross_street)):
+            for field in fields:
+                for gram in _ngrams(field):
+                    self._ngrams[gram].add(i)
+
+    def candidates(self, text):
+        """Return positions, in order, of stations which might contain
+        `text` in their name, address, or cross street
+        """
+        grams = _ngrams(text)
+        if not grams:
+            return range(len(self.name))
+        postings = sorted((self._ngrams.get(gram, set()) for gram in grams),
+                          key=len)
+        return sorted(postings[0].intersection(*postings[1:]))
+
+
+def _text_key(stations):
+    """The station fields which a `StationIndex` depends on, in order"""
+    return tuple((sta['name'], sta.get('address'), sta.get('cross_street'))
+                 for sta in stations)
+
+
+def _street_keys(streets):
+    """Yield each street name, and also each name without
+    a suffix such as "st" or "ave" (e.g. "halsted" for "halsted st")
+    """
+    for street in streets:
+        yield street
+        base, _, suffix = street.rpartition(' ')
+        if base and suffix in _STREET_SUFFIXES:
+            yield base
+
+
+def _ngrams(text):
+    """The set of all `NGRAM_LEN`-character substrings of `text`"""
+    return {text[i:i + NGRAM_LEN]
+            for i in range(len(text) - NGRAM_LEN + 1)}
+
+
+def station_index(stations):
+    """Return a `StationIndex` for this station list
+
+    `get_stations` builds a new list each time it reads the station
+    status feed, but the names and addresses come from the station
+    information feed, which rarely changes. Keep using the previous
+    index for as long as those fields are the same.
+    Assumes that station lists aren't modified after they're created.
+    """
+    if _INDEX['stations'] is not stations:
+        index = _INDEX['index']
+        key = _text_key(stations)
+        if index is None or index.key != key:
+            index = StationIndex(stations, key)
+        _INDEX['stations'], _INDEX['index'] = stations, index
+    return _INDEX['index']
+
+
 def _check_possible(possible, first, second=None):
     """If the list of possible stations has only one option,
     return it. Otherwise generate an informative error message."""
@@ -82,93 +233,144 @@ def matching_station_list(stations, first, second=None, exact=False):
     list of dict
         List of station status JSONs from the bikeshare API response
     """
+    # Results are remembered for as long as the station index is in use.
+    index = station_index(stations)
+    key = (first, second, exact)
+    possible = index.matches.get(key)
+    if possible is None:
+        possible = tuple(_match_stations(index, first, second, exact))
+        if len(index.matches) >= MATCH_CACHE_SIZE:
+            # Forget the oldest request.
+            del index.matches[next(iter(index.matches))]
+        index.matches[key] = possible
+    return [stations[i] for i in possible]
+
+
+def street_station_list(stations, street):
+    """List the stations on a street
+
+    Stations named after the street come first, followed by stations
+    which only have the street in their address or cross street.
+
+    Parameters
+    ----------
+    stations : list of dict
+        The 'stationBeanList' from the bikeshare API response
+    street : str
+        A street name, e.g. "Halsted Street"
+
+    Returns
+    -------
+    list of dict
+        List of station status JSONs from the bikeshare API response
+    """
+    index = station_index(stations)
+    possible = [stations[i]
+                for i in index.by_street.get(speech_to_text(street), [])]
+    named = {id(sta) for sta in possible}
+    possible.extend(sta for sta in matching_station_list(stations, street,
+                                                         exact=True)
+                    if id(sta) not in named)
+    return possible
+
+
+def _match_stations(index, first, second, exact):
+    """Search a `StationIndex`; see `matching_station_list`
+
+    Returns the positions of the matching stations.
+    """
     possible = []
     first = speech_to_text(first)
     if not second:
         # Search the "location" field.
-        for sta in stations:
-            if first == sta['name'].lower():
-                return [sta]
-        # Search the "address" field.
-        for sta in stations:
-            if first in sta.get('address', '').lower():
-                possible.append(sta)
-        # Search the "cross_street" field.
-        for sta in stations:
-            if first in sta.get('cross_street', '').lower():
-                possible.append(sta)
+        i = index.by_name.get(first)
+        if i is not None:
+            return [i]
+        # Search the "address" and "cross_street" fields in one pass.
+        # Address matches are listed before cross street matches.
+        cross_matches = []
+        for i in index.candidates(first):
+            if first in index.address[i]:
+                possible.append(i)
+            elif first in index.cross_street[i]:
+                cross_matches.append(i)
+        possible.extend(cross_matches)
 
         if not possible and not exact:
             # Do fuzzy matching if we couldn't find an exact match.
-            possible.extend(_fuzzy_match(first, stations))
+            possible.extend(_fuzzy_match(first, index))
     else:
         second = speech_to_text(second)
-        for sta in stations:
-            address = sta.get('address', '').lower()
-            cross_street = sta.get('cross_street', '').lower()
-            name = sta['name'].lower()
+        i = index.by_streets.get(frozenset((first, second)))
+        if i is not None:
+            return [i]
+        candidates = set(index.candidates(first))
+        candidates.intersection_update(index.candidates(second))
+        for i in sorted(candidates):
+            address = index.address[i]
+            cross_street = index.cross_street[i]
+            name = index.name[i]
             if ((first in address and second in address) or
                     (first in name and second in name) or
                     (first in cross_street and second in cross_street)):
-                possible.append(sta)
+                possible.append(i)
 
         if not possible and not exact:
-            possible.extend(_fuzzy_match_two(first, second, stations))
+            possible.extend(_fuzzy_match_two(first, second, index))
     return possible
 
 
-def _fuzzy_match(name, stations):
+def _fuzzy_match(name, index):
     """Compare the input name to all station names
     and pick the one that's closest.
-    Note the default `cutoff=0.6` in `get_close_matches`.
+    Require a similarity of at least 60%, the same as the
+    default `cutoff=0.6` in `difflib.get_close_matches`.
     If nothing if close enough, we won't return any
-    stations. The default seems reasonable.
+    stations. The cutoff seems reasonable.
     """
-    st_names = {s['name'].lower(): s for s in stations}
-    best_names = difflib.get_close_matches(name.lower(), st_names, n=1)
-    if not best_names:
+    # Only import `rapidfuzz` when we need it, to keep it out of cold starts.
+    from rapidfuzz import fuzz, process
+    best = process.extractOne(name.lower(), index.name,
+                              scorer=fuzz.ratio, score_cutoff=60)
+    if best is None:
         log.info("Didn't find a match for station \"%s\"." % name)
         return []
     else:
         log.info('Heard "%s", matching with station "%s".' %
-                 (name, best_names[0]))
-        return [st_names[best_names[0]]]
+                 (name, best[0]))
+        return [best[2]]
 
 
-def _fuzzy_match_two(first, second, stations):
+def _fuzzy_match_two(first, second, index):
     """If we have the station name in two parts
     (e.g. "street1" and "street2"), then check for
     possible matches by combining them in each order.
     Pick the match closest to the inputs.
     """
+    from rapidfuzz import fuzz
     order_one = _fuzzy_match(speech_to_text('%s and %s' % (first, second)),
-                             stations)
+                             index)
     order_two = _fuzzy_match(speech_to_text('%s and %s' % (second, first)),
-                             stations)
+                             index)
+
+    # Only score the matches if the two orders disagree.
+    if not order_one or not order_two or order_one == order_two:
+        # If no station names look like the user request,
+        # this is an empty list.
+        return order_one or order_two
 
     # Pick the best of this pair
-    score_one, score_two = 0, 0
-    if order_one:
-        score_one = difflib.SequenceMatcher(
-            None, '%s and %s' % (first, second),
-            order_one[0]['name']).ratio()
-    if order_two:
-        score_two = difflib.SequenceMatcher(
-            None, '%s and %s' % (second, first),
-            order_two[0]['name']).ratio()
+    score_one = fuzz.ratio('%s and %s' % (first, second),
+                           index.name[order_one[0]])
+    score_two = fuzz.ratio('%s and %s' % (second, first),
+                           index.name[order_two[0]])
     log.info('Heard names "%s" and "%s". Fuzzy match in '
              'forward order: %d; reverse %d' %
              (first, second, score_one, score_two))
     if score_one > score_two:
         return order_one
-    elif order_two:
-        # Make sure the second ordering had a
-        # match before returning it.
-        return order_two
     else:
-        # If no station names look like the user request,
-        # return an empty list.
-        return []
+        return order_two
 
 
 def find_station(stations, first, second=None, exact=False):
@@ -205,29 +407,20 @@ def find_station(stations, first, second=None, exact=False):
 def speech_to_text(address):
     """Standardize speech input to look like station names in the network
     """
-    # Add a space, since we look for spaces after abbreviations
-    address = address.lower() + ' '
-    address = address.replace(' and ', ' & ')
-
-    for ab, full in ABBREV.items():
-        address = address.replace(full, ab)
-
+    address = _SPEECH_ABBREV_RE.sub(lambda m: _SPEECH_ABBREV[m.group(1)],
+                                    address.lower())
     return address.strip()
 
 
+@functools.lru_cache(maxsize=2048)
 def text_to_speech(address):
     """Expand abbreviations in text so that Alexa can speak it
-    """
-    # Add a space, since we look for spaces after abbreviations
-    address = address.lower() + ' '
-    address = address.replace('&', 'and')
-    address = address.replace('(*)', '')
-
-    for ab, full in ABBREV.items():
-        address = address.replace(ab, full)
-    for ab, full in DIRECTIONS.items():
-        address = address.replace(ab, full)
 
+    Station names come from a fixed list, so remember the results.
+    """
+    address = address.lower().replace('&', 'and').replace('(*)', '')
+    address = _TEXT_ABBREV_RE.sub(lambda m: _TEXT_ABBREV[m.group(1)],
+                                  address)
     return address.strip()
 
 
@@ -242,19 +435,46 @@ def get_stations(bike_api):
 
     It combines the "station_information" and "station_status" feeds
     to get the necessary information in a single blob per station.
+    The feed URLs are remembered for `FEEDS_TTL` seconds, and the
+    station information for `STATION_INFO_TTL` seconds. When both
+    feeds are needed, they're downloaded concurrently.
     """
-    feeds = _get_feed_urls(bike_api)
-    sta_info = _get_station_info(feeds)
-    sta_status = _get_station_statuses(feeds)
+    now = time.monotonic()
+    cached = _FEEDS_CACHE.get(bike_api)
+    if cached is None or cached[0] < now:
+        cached = _FEEDS_CACHE[bike_api] = (now + FEEDS_TTL,
+                                           _get_feed_urls(bike_api))
+    feeds = cached[1]
+    info = _STATION_INFO_CACHE.get(bike_api)
+    try:
+        if info is None or info[0] < now:
+            with futures.ThreadPoolExecutor(max_workers=2) as pool:
+                sta_info = pool.submit(_get_station_info, feeds)
+                sta_status = pool.submit(_get_station_statuses, feeds)
+                sta_info, sta_status = sta_info.result(), sta_status.result()
+        else:
+            sta_info, sta_status = info[1], _get_station_statuses(feeds)
+            if not info[2].issuperset(st['station_id'] for st in sta_status):
+                # There's a new station; get its information.
+                sta_info = _get_station_info(feeds)
+    except (requests.RequestException, ValueError):
+        # The feed URLs may have changed; look them up again next time.
+        _FEEDS_CACHE.pop(bike_api, None)
+        _STATION_INFO_CACHE.pop(bike_api, None)
+        raise
+    if info is None or sta_info is not info[1]:
+        _STATION_INFO_CACHE[bike_api] = (
+            now + STATION_INFO_TTL, sta_info,
+            frozenset(st['station_id'] for st in sta_info))
 
     return _combine_status_and_info(sta_info, sta_status)
 
 
 def _get_feed_urls(bike_api, language='en'):
     """Reads the API feed for URLs to sub-feeds"""
-    resp = requests.get(bike_api)
+    resp = _SESSION.get(bike_api, timeout=TIMEOUT)
     resp.raise_for_status()
-    feeds = resp.json()['data'][language]['feeds']
+    feeds = orjson.loads(resp.content)['data'][language]['feeds']
 
     return {feed['name']: feed['url'] for feed in feeds}
 
@@ -264,9 +484,9 @@ def _get_station_statuses(feeds):
     if 'station_status' not in feeds:
         raise ValueError('Missing station status feed. Got feeds ' +
                          str(feeds))
-    resp = requests.get(feeds['station_status'])
+    resp = _SESSION.get(feeds['station_status'], timeout=TIMEOUT)
     resp.raise_for_status()
-    return resp.json()['data']['stations']
+    return orjson.loads(resp.content)['data']['stations']
 
 
 def _get_station_info(feeds):
@@ -274,9 +494,10 @@ def _get_station_info(feeds):
     if 'station_information' not in feeds:
         raise ValueError('Missing station information feed. Got feeds ' +
                          str(feeds))
-    resp = requests.get(feeds['station_information'])
+    resp = _SESSION.get(feeds['station_information'],
+                        timeout=TIMEOUT)
     resp.raise_for_status()
-    return resp.json()['data']['stations']
+    return orjson.loads(resp.content)['data']['stations']
 
 
 def _combine_status_and_info(sta_info, sta_status):
@@ -35,7 +35,23 @@ Alexa expects a response in the following format:
   }
 }
 
+Skills can also send a "progressive response" to speak while
+they finish working on a request:
+https://developer.amazon.com/docs/custom-skills/send-the-user-a-progressive-response.html
 """
+import logging
+
+import orjson
+import requests
+
+log = logging.getLogger(__name__)
+
+# Seconds to wait for the progressive response API. Progressive
+# responses are optional, so don't hold up the real reply for long.
+PROGRESSIVE_TIMEOUT = 1
+
+# Reuse connections to the Alexa API across requests.
+_SESSION = requests.Session()
 
 
 def build(speech, reprompt=None,
@@ -83,7 +99,7 @@ def build(speech, reprompt=None,
         "response": {
             "outputSpeech": {
                 "type": "SSML",
-                "ssml": "<speak>%s</speak>" % speech
+                "ssml": f"<speak>{speech}</speak>"
             },
             "shouldEndSession": is_end
         }
@@ -99,8 +115,50 @@ def build(speech, reprompt=None,
         output["response"]["reprompt"] = {
             "outputSpeech": {
                 "type": "SSML",
-                "ssml": "<speak>%s</speak>" % reprompt
+                "ssml": f"<speak>{reprompt}</speak>"
                 }
             }
 
     return output
+
+
+def progressive(speech, request_id, api_endpoint, api_token):
+    """Ask Alexa to speak while we prepare the full reply
+
+    Failures are logged and otherwise ignored, since the user
+    will still hear the full reply.
+
+    Parameters
+    ----------
+    speech: str
+        The text which Alexa should speak now. This will
+        be wrapped in "<speak>" tags.
+    request_id: str
+        The "requestId" of the request we're replying to
+    api_endpoint: str
+        The "apiEndpoint" from the request's "context.System"
+    api_token: str
+        The "apiAccessToken" from the request's "context.System"
+
+    Returns
+    -------
+    bool
+        True if Alexa accepted the progressive response
+    """
+    directive = {"header": {"requestId": request_id},
+                 "directive": {"type": "VoicePlayer.Speak",
+                               "speech": f"<speak>{speech}</speak>"}}
+    try:
+        resp = _SESSION.post(api_endpoint + '/v1/directives',
+                             data=orjson.dumps(directive),
+                             headers={'Authorization': 'Bearer ' + api_token,
+                                      'Content-Type': 'application/json'},
+                             timeout=PROGRESSIVE_TIMEOUT)
+    except requests.RequestException:
+        log.warning('Failed to send a progressive response.', exc_info=True)
+        return False
+    if resp.status_code != 204:
+        log.warning('Progressive response failed with status %d.' %
+                    resp.status_code)
+        return False
+    return True
@@ -2,11 +2,9 @@
 
 This module interfaces with AWS's S3 to read and store user data
 """
-import io
-import json
-
 import boto3
 from botocore.exceptions import ClientError
+import orjson
 
 from divvy import config
 
@@ -22,11 +20,8 @@ def put_user_data(user_id, **data):
     """Insert a new entry into the database.
     Any existing data for this user will be lost.
     """
-    with io.BytesIO() as tmp:
-        json.dump(data, tmp)
-        tmp.seek(0)
-        bucket.upload_fileobj(tmp, _keypath(user_id))
-        return True
+    bucket.put_object(Key=_keypath(user_id), Body=orjson.dumps(data))
+    return True
 
 
 def update_user_data(user_id, **data):
@@ -44,15 +39,13 @@ def get_user_data(user_id):
     """Return all data associated with a given user ID.
     Returns an empty dictionary if the user does not exist.
     """
-    with io.BytesIO() as tmp:
-        try:
-            bucket.download_fileobj(_keypath(user_id), tmp)
-        except ClientError:
-            # User not found
-            return {}
-        else:
-            tmp.seek(0)
-            return json.load(tmp)
+    try:
+        body = bucket.Object(_keypath(user_id)).get()['Body'].read()
+    except ClientError:
+        # User not found
+        return {}
+    else:
+        return orjson.loads(body)
 
 
 def delete_user(user_id):
@@ -1,5 +1,7 @@
 import math
 
+from unittest import mock
+
 from divvy import geocoding
 from divvy import test_handle
 
@@ -21,3 +23,24 @@ def test_stations_from_lat_lon():
     assert nearest[0]["name"] == "Adler Planetarium"
     assert nearest[1]["name"] == "Shedd Aquarium"
     assert nearest[2]["name"] == "Field Museum"
+
+
+@mock.patch.object(geocoding, "_geocode",
+                   return_value=(41.8, -87.6, "123 N State St"))
+def test_get_lat_lon_cached(mock_geocode):
+    geocoding._GEOCODE_CACHE.clear()
+    for addr in ["123 north state street, chicago, il",
+                 "123 North State Street, Chicago, IL",
+                 "123 north  state street, chicago, il "]:
+        out = geocoding.get_lat_lon(addr)
+    assert out == (41.8, -87.6, "123 N State St")
+    assert mock_geocode.call_count == 1
+
+
+@mock.patch.object(geocoding, "_geocode",
+                   return_value=(41.8, -87.6, "123 N State St"))
+def test_is_cached(mock_geocode):
+    geocoding._GEOCODE_CACHE.clear()
+    assert not geocoding.is_cached("123 North State Street, Chicago, IL")
+    geocoding.get_lat_lon("123 north state street, chicago, il")
+    assert geocoding.is_cached("123 North  State Street, Chicago, IL")
@@ -1,18 +1,30 @@
-import json
+import functools
 import os
 
 from unittest import mock
 
+import orjson
+import pytest
+
 from divvy import handle
 
 
-def _api_response(api_type='api'):
+@pytest.fixture(autouse=True)
+def clear_station_cache():
+    """Make sure each test sees its own mock station list"""
+    handle._STATIONS_CACHE['data'] = None
+
+
+@functools.lru_cache(maxsize=None)
+def _read_sample(basename):
+    """Read a sample file once; callers parse a fresh copy to mutate"""
+    fname = os.path.join(os.path.dirname(__file__), 'samples', basename)
+    with open(fname, 'rb') as _fin:
+        return _fin.read()
 
-    fname = os.path.join(os.path.dirname(__file__),
-                         'samples',
-                         'sample_divvy_' + api_type + '.json')
-    with open(fname, 'r') as _fin:
-        return json.load(_fin)
+
+def _api_response(api_type='api'):
+    return orjson.loads(_read_sample('sample_divvy_' + api_type + '.json'))
 
 
 def build_station_mock(not_renting=None):
@@ -22,6 +34,7 @@ def build_station_mock(not_renting=None):
 
     if not_renting:
         # All stations in my sample response are renting, so hack it.
+        not_renting = frozenset(not_renting)
         for s in sta:
             if int(s['station_id']) in not_renting:
                 s['is_renting'] = False
@@ -33,11 +46,7 @@ def build_station_mock(not_renting=None):
 
 
 def _get_request(intent, case):
-    fname = os.path.join(os.path.dirname(__file__),
-                         'samples',
-                         '%s_%s.json' % (intent, case))
-    with open(fname, 'r') as _fin:
-        return json.load(_fin)
+    return orjson.loads(_read_sample('%s_%s.json' % (intent, case)))
 
 
 @mock.patch.object(handle.location, "get_stations", build_station_mock())
@@ -121,3 +130,157 @@ def test_add_address_no_address(mock_db):
     assert out['sessionAttributes']['next_step'] == "num_and_name"
     assert ("I didn't understand that as an address.".lower() in
             out['response']['outputSpeech']['ssml'].lower())
+
+
+def test_get_stations_cached():
+    mock_get = mock.Mock(side_effect=build_station_mock())
+    with mock.patch.object(handle.location, "get_stations", mock_get):
+        first = handle._get_stations_cached()
+        second = handle._get_stations_cached()
+
+    assert first is second
+    assert mock_get.call_count == 1
+
+
+@mock.patch.object(handle.location, "get_stations", build_station_mock())
+def test_intent_dispatch_bike_falls_back_to_status():
+    event = _get_request('check_bike', 'two_street')
+    event['request']['intent']['slots']['bikes_or_docks'].pop('value', None)
+
+    out = handle.intent(event['request'], event['session'])
+    expected = 'there are 5 bikes and 9 docks at the ' \
+               'halsted street and archer avenue station'
+
+    assert expected in out['response']['outputSpeech']['ssml'].lower()
+
+
+@mock.patch.object(handle.reply, "progressive")
+@mock.patch("divvy.geocoding.get_lat_lon",
+            return_value=(41.9, -87.6, "123 N State St, Chicago, IL"))
+def test_add_address_progressive_response(mock_geo, mock_prog):
+    event = _get_request('add_address', 'bad_address')
+    event['session']['attributes'].update(next_step='check_address',
+                                          spoken_address='123 north state',
+                                          zip_code='')
+    event['request']['intent']['name'] = 'AddAddressIntent'
+    context = {'System': {'apiEndpoint': 'https://api.amazonalexa.com',
+                          'apiAccessToken': 'token'}}
+
+    out = handle.intent(event['request'], event['session'], context)
+
+    assert out['sessionAttributes']['next_step'] == 'store_address'
+    mock_prog.assert_called_once()
+    assert mock_prog.call_args[1]['api_token'] == 'token'
+    assert 'progressive' not in out['sessionAttributes']
+
+
+@mock.patch.object(handle.reply, "progressive")
+@mock.patch("divvy.geocoding.is_cached", return_value=True)
+@mock.patch("divvy.geocoding.get_lat_lon",
+            return_value=(41.9, -87.6, "123 N State St, Chicago, IL"))
+def test_add_address_no_progressive_response_when_cached(mock_geo, mock_cached,
+                                                         mock_prog):
+    event = _get_request('add_address', 'bad_address')
+    event['session']['attributes'].update(next_step='check_address',
+                                          spoken_address='123 north state',
+                                          zip_code='')
+    event['request']['intent']['name'] = 'AddAddressIntent'
+    context = {'System': {'apiEndpoint': 'https://api.amazonalexa.com',
+                          'apiAccessToken': 'token'}}
+
+    out = handle.intent(event['request'], event['session'], context)
+
+    assert out['sessionAttributes']['next_step'] == 'store_address'
+    mock_prog.assert_not_called()
+
+
+@mock.patch.object(handle.reply, "progressive")
+@mock.patch.object(handle.location, "get_stations", build_station_mock())
+@mock.patch.object(handle, "database")
+def test_check_commute_progressive_response_only_when_fetching(mock_db,
+                                                               mock_prog):
+    mock_db.get_user_data.return_value = {
+        'origin': {'latitude': '41.847', 'longitude': '-87.646'}}
+    session = {'user': {'userId': 'amzn1.ask.account.VERYLONGUSERID'},
+               'progressive': {'request_id': 'id',
+                               'api_endpoint': 'https://api.amazonalexa.com',
+                               'api_token': 'token'}}
+
+    handle.check_commute({}, session)
+    handle.check_commute({}, session)
+
+    mock_prog.assert_called_once()
+
+
+@mock.patch.object(handle.location, "get_stations", build_station_mock())
+def test_check_status_no_station():
+    intent = _get_request('check_status', 'two_street')['request']['intent']
+    intent['slots'] = {'bikes_or_docks': {'name': 'bikes_or_docks'}}
+
+    out = handle.check_status(intent, {})
+
+    assert not out['response']['shouldEndSession']
+    assert ("I didn't understand that".lower() in
+            out['response']['outputSpeech']['ssml'].lower())
+
+
+@mock.patch.object(handle.location, "get_stations", build_station_mock())
+@mock.patch.object(handle, "database")
+def test_check_commute(mock_db):
+    mock_db.get_user_data.return_value = {
+        'origin': {'latitude': '41.847', 'longitude': '-87.646'},
+        'destination': {'latitude': '41.879', 'longitude': '-87.630'}}
+    session = {'user': {'userId': 'amzn1.ask.account.VERYLONGUSERID'}}
+
+    out = handle.check_commute({}, session)
+    expected = 'there are 5 bikes at the ' \
+               'halsted street and archer avenue station'
+
+    assert expected in out['response']['outputSpeech']['ssml'].lower()
+    assert out['response']['shouldEndSession']
+
+
+@mock.patch.object(handle.location, "get_stations")
+@mock.patch.object(handle, "database")
+def test_check_commute_no_addresses(mock_db, mock_get_stations):
+    mock_db.get_user_data.return_value = {'user_id': 'someone'}
+    session = {'user': {'userId': 'amzn1.ask.account.VERYLONGUSERID'}}
+
+    out = handle.check_commute({}, session)
+
+    assert ("I don't remember any of your addresses".lower() in
+            out['response']['outputSpeech']['ssml'].lower())
+    mock_get_stations.assert_not_called()
+
+
+@mock.patch.object(handle.location, "get_stations", build_station_mock())
+def test_list_stations():
+    intent = {'name': 'ListStationIntent',
+              'slots': {'street_name': {'name': 'street_name',
+                                        'value': 'halsted'}}}
+    # The sample stations don't have addresses, so pick some by name.
+    on_halsted = [s for s in _api_response('get_stations_output')
+                  if 'Halsted' in s['name']][:3]
+
+    with mock.patch.object(handle.location, "street_station_list",
+                           return_value=on_halsted):
+        out = handle.list_stations(intent, {})
+    speech = out['response']['outputSpeech']['ssml'].lower()
+
+    assert speech.startswith('<speak>there are 3 stations on halsted: ')
+    assert speech.count(', ') == 2
+    assert ', and ' in speech
+    assert '&' not in speech
+
+
+def test_prefetch_stations_logs_errors():
+    mock_get = mock.Mock(side_effect=RuntimeError('API down'))
+    with mock.patch.object(handle.location, "get_stations", mock_get):
+        handle._prefetch_stations()
+
+    assert handle._STATIONS_CACHE['data'] is None
+    assert mock_get.call_count == 1
+
+
+def test_get_bikes_available_without_ebikes():
+    assert handle._get_bikes_available({'num_bikes_available': 4}) == 4
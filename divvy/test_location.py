@@ -1,6 +1,8 @@
 import os
-import json
 
+from unittest import mock
+
+import orjson
 import pytest
 
 from divvy import location
@@ -11,8 +13,8 @@ def _api_response(api_type='api'):
     fname = os.path.join(os.path.dirname(__file__),
                          'samples',
                          'sample_divvy_' + api_type + '.json')
-    with open(fname, 'r') as _fin:
-        return json.load(_fin)
+    with open(fname, 'rb') as _fin:
+        return orjson.loads(_fin.read())
 
 
 def _station_list():
@@ -97,6 +99,22 @@ def test_find_station_fuzzy_pair_flipped():
     assert 'Ashland Ave & Grand Ave' == found['name']
 
 
+@pytest.mark.parametrize('first, second, expected', [
+    ('uroadway', 'cornelia avenue', 'Broadway & Cornelia Ave'),
+    ('aincoln avenue', 'sunnyside avenue', 'Lincoln Ave & Sunnyside Ave'),
+    ('lrake avenue', 'fullerton avenue', 'Drake Ave & Fullerton Ave'),
+    ('keystone avenue', 'nullerton avenue', 'Keystone Ave & Fullerton Ave'),
+    ('california avenue', 'xyron street', 'California Ave & Byron St'),
+    ('spaulding avenue', 'xrmitage avenue', 'Spaulding Ave & Armitage Ave'),
+])
+def test_find_station_fuzzy_pair_misheard(first, second, expected):
+    sta = _station_list()
+
+    found = location.find_station(sta, first, second, exact=False)
+
+    assert found['name'] == expected
+
+
 def test_find_station_one_ambiguous():
     sta = _station_list()
 
@@ -123,3 +141,131 @@ def test_text_to_speech_address():
 def test_text_to_speech_two_street_star():
     out = location.text_to_speech('Loomis St & Taylor St (*)')
     assert out.lower() == 'loomis street and taylor street'
+
+
+def test_find_station_two_street_exact_name():
+    sta = _station_list()
+
+    found = location.find_station(sta, 'Concord Lane', 'Wells Street',
+                                  exact=True)
+
+    assert 'Wells St & Concord Ln' == found['name']
+
+
+def test_street_station_list():
+    sta = _station_list()
+
+    found = location.street_station_list(sta, 'Halsted Street')
+
+    assert len(found) > 1
+    assert all('Halsted St' in s['name'] for s in found)
+
+
+def test_street_station_list_includes_addresses():
+    sta = [{'name': 'Clark St & Elm St'},
+           {'name': 'Museum Campus', 'address': '100 N Clark St'}]
+
+    found = location.street_station_list(sta, 'Clark Street')
+
+    assert [s['name'] for s in found] == ['Clark St & Elm St',
+                                          'Museum Campus']
+
+
+def test_find_station_one_street_in_many_names():
+    sta = _station_list()
+
+    found = location.find_station(sta, 'Clark Street')
+
+    assert found['name'] == 'Clark St & Elm St'
+
+
+def test_street_station_list_without_suffix():
+    sta = _station_list()
+
+    found = location.street_station_list(sta, 'Halsted')
+
+    assert found == location.street_station_list(sta, 'Halsted Street')
+
+
+def test_matching_station_list_bare_street_not_indexed():
+    # Suffix-less street keys only add candidates to `street_station_list`.
+    sta = _station_list()
+
+    assert location.matching_station_list(sta, 'Clark', exact=True) == []
+    assert len(location.street_station_list(sta, 'Clark')) > 1
+
+
+def test_get_stations_reuses_feed_urls_and_info():
+    feeds = {'station_information': 'info', 'station_status': 'status'}
+    sta_info = [{'station_id': '1', 'name': 'A St & B Ave'}]
+    sta_status = [{'station_id': '1', 'num_bikes_available': 3}]
+    location._FEEDS_CACHE.clear()
+    location._STATION_INFO_CACHE.clear()
+    with mock.patch.object(location, '_get_feed_urls',
+                           return_value=feeds) as mock_feeds, \
+            mock.patch.object(location, '_get_station_info',
+                              return_value=sta_info) as mock_info, \
+            mock.patch.object(location, '_get_station_statuses',
+                              return_value=sta_status) as mock_status:
+        location.get_stations('api')
+        stations = location.get_stations('api')
+
+        # A new station in the status feed needs its information.
+        sta_status.append({'station_id': '2', 'num_bikes_available': 1})
+        sta_info.append({'station_id': '2', 'name': 'C St & D Ave'})
+        new_stations = location.get_stations('api')
+
+    assert mock_feeds.call_count == 1
+    assert mock_info.call_count == 2
+    assert mock_status.call_count == 3
+    assert stations[0]['name'] == 'A St & B Ave'
+    assert new_stations[1]['name'] == 'C St & D Ave'
+
+
+def test_station_index_reused_after_status_refresh():
+    sta = _station_list()
+    refreshed = [dict(s, num_bikes_available=0) for s in sta]
+
+    index = location.station_index(sta)
+    found = location.find_station(refreshed, 'Wells Street', 'Concord Lane')
+
+    assert location.station_index(refreshed) is index
+    assert found['num_bikes_available'] == 0
+
+
+def test_station_index_rebuilt_for_new_names():
+    sta = _station_list()
+    renamed = [dict(sta[0], name='Renamed St & Other Ave')] + sta[1:]
+
+    index = location.station_index(sta)
+
+    assert location.station_index(renamed) is not index
+    assert location.find_station(renamed, 'Renamed Street',
+                                 'Other Avenue') is renamed[0]
+
+
+def test_matching_station_list_cached():
+    sta = _station_list()
+
+    first = location.matching_station_list(sta, 'ashlande', 'grand avenue')
+    with mock.patch.object(location, '_match_stations') as mock_match:
+        second = location.matching_station_list(sta, 'ashlande',
+                                                'grand avenue')
+
+    assert first == second
+    assert first is not second
+    assert mock_match.call_count == 0
+
+
+def test_matching_station_list_cached_across_status_refresh():
+    sta = _station_list()
+    refreshed = [dict(s) for s in sta]
+
+    first = location.matching_station_list(sta, 'ashlande', 'grand avenue')
+    with mock.patch.object(location, '_match_stations') as mock_match:
+        second = location.matching_station_list(refreshed, 'ashlande',
+                                                'grand avenue')
+
+    assert mock_match.call_count == 0
+    assert second == first
+    assert all(any(s is r for r in refreshed) for s in second)
@@ -6,33 +6,41 @@ from divvy import handle
 from divvy import reply
 
 log = logging.getLogger(__name__)
+logging.basicConfig(level=getattr(config, 'log_level', 'INFO'),
+                    stream=sys.stderr)
+
+LAUNCH_REPLY = reply.build(f"Ask me a question about a "
+                           f"{config.network_name} station.",
+                           is_end=False)
+SESSION_ENDED_REPLY = reply.build("Bike safe!", is_end=True)
 
 # --------------------------- Lambda Function ----------------------------------
 def lambda_handler(event, context):
     """ Route the incoming request based on type (LaunchRequest, IntentRequest,
     etc.) The JSON body of the request is provided in the event parameter.
     """
-    logging.basicConfig(level=getattr(config, 'log_level', 'INFO'),
-                        stream=sys.stderr)
+    # Scheduled warm-up events carry no session; answer without doing work.
+    if event.get('source') == 'aws.events' or event.get('ping'):
+        return {'pong': True}
 
     # This `if` prevents other Skills from using this Lambda
-    if event['session']['application']['applicationId'] != config.APP_ID:
+    app_id = (event.get('session', {})
+              .get('application', {})
+              .get('applicationId'))
+    if app_id != config.APP_ID:
         raise ValueError("Invalid Application ID")
 
     try:
         if event['request']['type'] == "IntentRequest":
-            return handle.intent(event['request'], event['session'])
+            return handle.intent(event['request'], event['session'],
+                                 event.get('context'))
         elif event['request']['type'] == "LaunchRequest":
-            return reply.build(f"Ask me a question about a "
-                               f"{config.network_name} station.",
-                               is_end=False)
+            return LAUNCH_REPLY
         elif event['request']['type'] == "SessionEndedRequest":
-            return reply.build("Bike safe!", is_end=True)
+            return SESSION_ENDED_REPLY
         else:
             # I don't think there's any other kinds of requests.
-            return reply.build(f"Ask me a question about a "
-                               f"{config.network_name} station.",
-                               is_end=False)
+            return LAUNCH_REPLY
     except Exception as err:  # NOQA
         log.exception('Unhandled exception for event\n%s\n' % str(event))
         return reply.build("Sorry, something went wrong. Please try again.",